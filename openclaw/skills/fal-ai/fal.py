@@ -7,6 +7,8 @@ Generate images, videos, music, and more using 600+ fal.ai models.
 import os
 import sys
 import json
+import shutil
+import subprocess
 import urllib.request
 import urllib.error
 import urllib.parse
@@ -57,6 +59,235 @@ def download_file(url: str, path: str):
     urllib.request.urlretrieve(url, path)
     print(f"Saved: {path}", file=sys.stderr)
 
+def ensure_pil():
+    try:
+        import PIL
+        return PIL
+    except ImportError:
+        print("Error: Pillow not installed (needed for --post). Run: pip3 install Pillow", file=sys.stderr)
+        sys.exit(1)
+
+def check_post(post, video: bool = False):
+    """Validate --post and its dependencies before any paid generation runs."""
+    if post is True or post.startswith("--"):
+        print("Error: --post requires a directory", file=sys.stderr)
+        sys.exit(1)
+    ensure_pil()
+    if video:
+        for tool in ("ffmpeg", "ffprobe"):
+            if not shutil.which(tool):
+                print(f"Error: {tool} not found (needed for --post on video)", file=sys.stderr)
+                sys.exit(1)
+
+def indexed_path(path: str, i: int) -> str:
+    """logo.png → logo.png, logo_1.png, logo_2.png, ..."""
+    if i == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{i}{ext}"
+
+# ── Post-processing (thumbnails, contact sheets, near-duplicate flags) ──────
+
+THUMB_SIZE = 256
+SHEET_TILES = 4
+DUP_THRESHOLD = 6  # max differing bits per 64-bit hash to call two outputs near-duplicates
+VIDEO_EXTS = (".mp4", ".mov", ".webm", ".mkv", ".gif")
+
+def dhash(path: str) -> str:
+    """64-bit difference hash of an image, as 16 hex chars."""
+    from PIL import Image
+    with Image.open(path) as im:
+        px = im.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+def is_near_duplicate(a: str, b: str) -> bool:
+    """Compare hashes of equal length (videos concatenate one dHash per sampled frame)."""
+    if len(a) != len(b):
+        return False
+    diff = bin(int(a, 16) ^ int(b, 16)).count("1")
+    return diff <= DUP_THRESHOLD * (len(a) // 16)
+
+def make_thumbnail(src: str, dest: str, size: int = THUMB_SIZE):
+    from PIL import Image
+    with Image.open(src) as im:
+        im = im.convert("RGB")
+        im.thumbnail((size, size))
+        im.save(dest, "JPEG", quality=85)
+
+def make_contact_sheet(frames: list, dest: str, size: int = THUMB_SIZE):
+    """Tile frames left to right, each scaled to fit size x size."""
+    from PIL import Image
+    tiles = []
+    for frame in frames:
+        with Image.open(frame) as im:
+            im = im.convert("RGB")
+            im.thumbnail((size, size))
+            tiles.append(im)
+    sheet = Image.new("RGB", (sum(t.width for t in tiles), max(t.height for t in tiles)))
+    x = 0
+    for t in tiles:
+        sheet.paste(t, (x, 0))
+        x += t.width
+    sheet.save(dest, "JPEG", quality=85)
+
+def ffmpeg(*args: str):
+    subprocess.run(["ffmpeg", "-v", "error", "-y", *args], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+def video_duration(path: str) -> float:
+    out = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                          "-of", "csv=p=0", path], check=True, capture_output=True, text=True)
+    try:
+        return float(out.stdout.strip())
+    except ValueError:
+        return 0.0
+
+def grab_frames(path: str, tmp_dir: str, n: int = SHEET_TILES) -> list:
+    """Extract n frames evenly spaced across the clip (midpoints, so fades and the
+    conditioning image at t=0 don't dominate)."""
+    duration = video_duration(path)
+    times = [duration * (i + 0.5) / n for i in range(n)] if duration > 0 else [0.0]
+    frames = []
+    for i, t in enumerate(times):
+        frame = os.path.join(tmp_dir, f"frame{i}.png")
+        ffmpeg("-ss", f"{t:.3f}", "-i", path, "-frames:v", "1", frame)
+        frames.append(frame)
+    return frames
+
+def post_process_file(path: str, out_dir: str, size: int = THUMB_SIZE) -> dict:
+    """Worker: derive thumbnail (+ keyframe and contact sheet for video) and a perceptual hash.
+
+    Runs in a child process, so it only takes/returns plain picklable values.
+    """
+    import hashlib
+    import tempfile
+    path = os.path.abspath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Same-stem outputs (a/cat.png vs b/cat.png, cat.png vs cat.mp4) share out_dir
+    prefix = os.path.join(out_dir, f"{stem}-{hashlib.sha1(path.encode()).hexdigest()[:8]}")
+    entry = {"file": path, "kind": "video" if path.lower().endswith(VIDEO_EXTS) else "image"}
+    try:
+        if entry["kind"] == "video":
+            with tempfile.TemporaryDirectory() as tmp:
+                frames = grab_frames(path, tmp)
+                keyframe = f"{prefix}.keyframe.jpg"
+                make_thumbnail(frames[len(frames) // 2], keyframe, 1024)
+                entry["keyframe"] = keyframe
+                make_thumbnail(keyframe, f"{prefix}.thumb.jpg", size)
+                entry["thumbnail"] = f"{prefix}.thumb.jpg"
+                make_contact_sheet(frames, f"{prefix}.sheet.jpg", size)
+                entry["contact_sheet"] = f"{prefix}.sheet.jpg"
+                entry["phash"] = "".join(dhash(f) for f in frames)
+        else:
+            make_thumbnail(path, f"{prefix}.thumb.jpg", size)
+            entry["thumbnail"] = f"{prefix}.thumb.jpg"
+            entry["phash"] = dhash(path)
+    except subprocess.CalledProcessError as e:
+        entry["error"] = f"ffmpeg: {e.stderr.decode(errors='replace').strip()}"
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+    return entry
+
+class PostProcessor:
+    """Post-processes outputs as soon as each download lands, in a process pool
+    (or inline when there is only one file).
+
+    Results are merged into <out_dir>/manifest.json under a file lock, so
+    concurrent invocations (e.g. a parallel prompt sweep) accumulate into one
+    manifest and are dedup-checked against everything already in it.
+    """
+
+    def __init__(self, out_dir: str, size: int = THUMB_SIZE, max_workers: Optional[int] = None):
+        from concurrent.futures import ProcessPoolExecutor
+        self.out_dir = os.path.abspath(out_dir)
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.size = size
+        self.manifest_path = os.path.join(self.out_dir, "manifest.json")
+        self.pool = None if max_workers == 1 else ProcessPoolExecutor(max_workers=max_workers)
+        self.jobs = []
+
+    def submit(self, path: str, **meta):
+        from concurrent.futures import Future
+        if self.pool:
+            fut = self.pool.submit(post_process_file, path, self.out_dir, self.size)
+        else:
+            fut = Future()
+            fut.set_result(post_process_file(path, self.out_dir, self.size))
+        self.jobs.append((path, fut, meta))
+
+    def finish(self) -> dict:
+        """Wait for workers, flag near-duplicates and write the manifest.
+
+        Never raises: callers run this after a paid generation and must still
+        print its result, so manifest problems are reported on stderr instead.
+        """
+        entries = []
+        for path, fut, meta in self.jobs:
+            try:
+                entry = fut.result()
+            except Exception as e:
+                entry = {"file": os.path.abspath(path), "error": f"{type(e).__name__}: {e}"}
+            entry.update(meta)
+            entries.append(entry)
+            if "error" in entry:
+                print(f"Post-processing failed for {entry['file']}: {entry['error']}", file=sys.stderr)
+        if self.pool:
+            self.pool.shutdown()
+
+        try:
+            manifest = self.merge_manifest(entries)
+        except Exception as e:
+            print(f"Manifest update failed ({self.manifest_path}): {type(e).__name__}: {e}", file=sys.stderr)
+            return {"entries": entries}
+        print(f"Manifest: {self.manifest_path}", file=sys.stderr)
+        return manifest
+
+    def read_manifest(self) -> dict:
+        """Load the existing manifest; an unreadable one is moved aside to .bak."""
+        if not os.path.exists(self.manifest_path):
+            return {"entries": []}
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if isinstance(manifest, dict) and isinstance(manifest.get("entries"), list):
+                return manifest
+            problem = "no \"entries\" list"
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            problem = str(e)
+        backup = self.manifest_path + ".bak"
+        os.replace(self.manifest_path, backup)
+        print(f"Warning: {self.manifest_path} is invalid ({problem}); moved to {backup}", file=sys.stderr)
+        return {"entries": []}
+
+    def merge_manifest(self, entries: list) -> dict:
+        import fcntl
+        with open(self.manifest_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            manifest = self.read_manifest()
+            # Re-generated files replace their old entries
+            new_files = {e["file"] for e in entries}
+            seen = [e for e in manifest["entries"] if isinstance(e, dict) and e.get("file") not in new_files]
+
+            for entry in entries:
+                if "phash" in entry:
+                    for prev in seen:
+                        if "phash" in prev and is_near_duplicate(entry["phash"], prev["phash"]):
+                            entry["duplicate_of"] = prev["file"]
+                            print(f"⚠️  {entry['file']} looks like a near-duplicate of {prev['file']}", file=sys.stderr)
+                            break
+                seen.append(entry)
+
+            manifest["entries"] = seen
+            tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, self.manifest_path)
+        return manifest
+
 # ── Platform API (https://api.fal.ai/v1/) ───────────────────────────────────
 
 PLATFORM_BASE = "https://api.fal.ai/v1"
@@ -173,8 +404,14 @@ def cmd_stream(model: str, params: dict):
 # ── Quick Shortcuts ──────────────────────────────────────────────────────────
 
 def cmd_image(prompt: str, model: str = "fal-ai/nano-banana-pro", size: str = "landscape_4_3",
-              save: Optional[str] = None, extra: Optional[dict] = None):
-    """Quick image generation with sensible defaults."""
+              save: Optional[str] = None, extra: Optional[dict] = None, post: Optional[str] = None,
+              save_all: bool = False):
+    """Quick image generation with sensible defaults.
+
+    `save` keeps the first image; with `save_all`, every returned image is saved
+    (logo.png, logo_1.png, ...). With `post`, each saved image is handed to the
+    post-processing pool as its download finishes.
+    """
     params = {"prompt": prompt, "image_size": size}
     if extra:
         params.update(extra)
@@ -190,12 +427,24 @@ def cmd_image(prompt: str, model: str = "fal-ai/nano-banana-pro", size: str = "l
 
     images = result.get("images", [])
     if save and images:
-        download_file(images[0]["url"], save)
+        if not save_all:
+            images = images[:1]
+        pp = PostProcessor(post, max_workers=min(len(images), os.cpu_count() or 1)) if post else None
+        try:
+            for i, img in enumerate(images):
+                path = indexed_path(save, i)
+                download_file(img["url"], path)
+                if pp:
+                    pp.submit(path, prompt=prompt, model=model)
+        finally:
+            if pp:
+                pp.finish()
 
     print(json.dumps(result, indent=2))
 
 def cmd_video(prompt: str, model: str = "fal-ai/minimax-video/video-01-live",
-              image_url: Optional[str] = None, save: Optional[str] = None, extra: Optional[dict] = None):
+              image_url: Optional[str] = None, save: Optional[str] = None, extra: Optional[dict] = None,
+              post: Optional[str] = None):
     """Quick video generation."""
     params = {"prompt": prompt}
     if image_url:
@@ -215,6 +464,10 @@ def cmd_video(prompt: str, model: str = "fal-ai/minimax-video/video-01-live",
     video = result.get("video", {})
     if save and video.get("url"):
         download_file(video["url"], save)
+        if post:
+            pp = PostProcessor(post, max_workers=1)
+            pp.submit(save, prompt=prompt, model=model)
+            pp.finish()
 
     print(json.dumps(result, indent=2))
 
@@ -461,8 +714,13 @@ USAGE = """
 fal.ai CLI v2 (official fal-client + Platform APIs)
 
 QUICK COMMANDS:
-  image <prompt> [--model M] [--size S] [--save path] [--extra '{}']
-  video <prompt> [--model M] [--image URL] [--save path] [--extra '{}']
+  image <prompt> [--model M] [--size S] [--save path] [--save-all] [--extra '{}'] [--post DIR]
+  video <prompt> [--model M] [--image URL] [--save path] [--extra '{}'] [--post DIR]
+      --post DIR writes thumbnails, keyframes/contact sheets, perceptual
+      hashes and a manifest.json (near-duplicates flagged) into DIR.
+      Requires --save, Pillow, and ffmpeg/ffprobe for video.
+      image --save-all saves every returned image (name.png, name_1.png, ...),
+      not just the first.
 
 GENERATION:
   subscribe <model> <json>       Run with auto-queue + polling (recommended)
@@ -493,6 +751,7 @@ PRICING & USAGE:
 EXAMPLES:
   python3 fal.py image "vibrant Miami sunset over Brickell"
   python3 fal.py image "logo" --model fal-ai/flux-pro/v1.1 --save logo.png
+  python3 fal.py image "logo" --save out/logo.png --save-all --extra '{"num_images": 4}' --post out/post
   python3 fal.py models "video" --category text-to-video
   python3 fal.py latest --category text-to-image --limit 5
   python3 fal.py info fal-ai/nano-banana-pro
@@ -535,8 +794,13 @@ def main():
         prompt = args[0]
         opts = parse_extras(args[1:])
         extra = parse_json(opts["extra"]) if "extra" in opts else None
+        if "post" in opts:
+            check_post(opts["post"])
+            if "save" not in opts:
+                print("Error: --post requires --save", file=sys.stderr); sys.exit(1)
         cmd_image(prompt, model=opts.get("model", "fal-ai/nano-banana-pro"),
-                  size=opts.get("size", "landscape_4_3"), save=opts.get("save"), extra=extra)
+                  size=opts.get("size", "landscape_4_3"), save=opts.get("save"), extra=extra,
+                  post=opts.get("post"), save_all=bool(opts.get("save-all")))
 
     elif cmd == "video":
         if not args:
@@ -544,8 +808,13 @@ def main():
         prompt = args[0]
         opts = parse_extras(args[1:])
         extra = parse_json(opts["extra"]) if "extra" in opts else None
+        if "post" in opts:
+            check_post(opts["post"], video=True)
+            if "save" not in opts:
+                print("Error: --post requires --save", file=sys.stderr); sys.exit(1)
         cmd_video(prompt, model=opts.get("model", "fal-ai/minimax-video/video-01-live"),
-                  image_url=opts.get("image"), save=opts.get("save"), extra=extra)
+                  image_url=opts.get("image"), save=opts.get("save"), extra=extra,
+                  post=opts.get("post"))
 
     # ── Generation ──
     elif cmd == "subscribe":